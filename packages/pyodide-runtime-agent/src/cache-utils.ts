@@ -5,7 +5,8 @@
  * like numpy and pandas ready to go. But loading 20+ packages takes time.
  *
  * This module organizes packages into groups for smart loading:
- * - Bootstrap: Minimal packages needed for IPython setup (micropip, ipython)
+ * - Bootstrap: Minimal packages needed for IPython setup (micropip, ipython,
+ *   orjson)
  * - Essential: Always loaded (numpy, pandas, matplotlib, etc.)
  * - Preload: Core packages loaded first for fast startup
  * - On-demand: Useful packages loaded as needed
@@ -20,7 +21,7 @@
  * These are loaded via loadPyodide's packages option for maximum efficiency
  */
 export function getBootstrapPackages(): string[] {
-  return ["micropip", "ipython", "matplotlib"];
+  return ["micropip", "ipython", "matplotlib", "orjson"];
 }
 
 /**
@@ -40,6 +41,7 @@ export function getEssentialPackages(): string[] {
     "pyarrow",
     "requests",
     "micropip",
+    "orjson",
     "pyodide-http",
     "scipy",
     "sympy",
@@ -109,6 +111,7 @@ export function getPreloadPackages(): string[] {
     "matplotlib",
     "requests",
     "micropip",
+    "orjson",
     "pyodide-http",
     "rich",
   ];
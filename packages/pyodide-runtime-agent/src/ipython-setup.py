@@ -17,21 +17,164 @@ import os
 import sys
 import io
 import json
+import time
+import traceback
+import importlib.abc
+import importlib.util
 
 from IPython.core.interactiveshell import InteractiveShell
 from IPython.core.displayhook import DisplayHook
 from IPython.core.displaypub import DisplayPublisher
 from IPython.core.history import HistoryManager
-import matplotlib
-import matplotlib.pyplot as plt
 
-# Configure matplotlib for rich SVG output
-matplotlib.use("svg")
-plt.rcParams["figure.dpi"] = 100
-plt.rcParams["savefig.dpi"] = 100
-plt.rcParams["figure.facecolor"] = "white"
-plt.rcParams["savefig.facecolor"] = "white"
-plt.rcParams["figure.figsize"] = (8, 6)
+# Configure matplotlib for rich SVG output. matplotlib itself is only
+# imported when user code first imports pyplot (see PyplotImportHook).
+os.environ["MPLBACKEND"] = "svg"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the stdlib encoder
+
+# Values of these exact types are always JSON serializable
+_PRIMITIVE_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+# Type names of values converted to strings since the last warning. Reported
+# once per published output instead of once per value.
+_stringified_types = []
+
+
+# Converters to a JSON-native form, cached per type (None means stringify)
+_converters = {}
+
+
+def _converter_for(value_type):
+    """Find a JSON-native conversion for a type the encoder can't handle"""
+    np = sys.modules.get("numpy")
+    if np is not None:
+        if issubclass(value_type, (np.number, np.bool_)):
+            return np.generic.item
+        if issubclass(value_type, np.ndarray):
+            return np.ndarray.tolist
+    return None
+
+
+def _json_default(value):
+    """Convert values the JSON encoder cannot handle natively"""
+    value_type = type(value)
+    try:
+        convert = _converters[value_type]
+    except KeyError:
+        convert = _converters[value_type] = _converter_for(value_type)
+
+    if convert is not None:
+        return convert(value)
+
+    _stringified_types.append(value_type.__name__)
+    return str(value)
+
+
+def _report_stringified():
+    """Log a single warning covering every value stringified so far"""
+    if _stringified_types:
+        names = sorted(set(_stringified_types))
+        print(
+            f"[SERIALIZATION_WARNING] {len(_stringified_types)} non-serializable "
+            f"value(s) converted to strings, types: {', '.join(names[:5])}"
+            f"{'...' if len(names) > 5 else ''}",
+            flush=True,
+        )
+        _stringified_types.clear()
+
+
+# Encode in a single pass: values the encoder cannot handle are converted by
+# _json_default inline instead of probing every value separately. Datetimes
+# and dataclasses are passed through so they are stringified like with json.
+if orjson is not None:
+    _ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    def _encode(obj):
+        encoded = orjson.dumps(obj, default=_json_default, option=_ORJSON_OPTIONS)
+        return encoded.decode("utf-8")
+
+    _loads = orjson.loads
+else:
+
+    def _encode(obj):
+        # JSON.parse rejects NaN/Infinity - raise so callers take the dict path
+        return json.dumps(obj, default=_json_default, allow_nan=False)
+
+    _loads = json.loads
+
+
+def _dumps(obj):
+    """Encode obj to JSON text, stringifying unsupported values"""
+    count = len(_stringified_types)
+    try:
+        return _encode(obj)
+    except (TypeError, ValueError):
+        # Callers retry piece by piece - don't count this attempt
+        del _stringified_types[count:]
+        raise
+
+
+def _bounded_to_dict(obj):
+    """Call obj.to_dict(), keeping only the rows pandas would display"""
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series)):
+        max_rows = pd.get_option("display.max_rows")
+        if max_rows and len(obj) > max_rows:
+            # Same head/tail split as pandas' truncated repr
+            half = max_rows // 2
+            obj = pd.concat([obj.head(half), obj.tail(max_rows - half)])
+    return obj.to_dict()
+
+
+def _serialize_dict(d):
+    """Convert a dict to a JSON-serializable dict with string keys"""
+    # Format dicts are usually all strings - nothing to convert
+    primitive_types = _PRIMITIVE_TYPES
+    if all(
+        type(key) is str and type(value) in primitive_types for key, value in d.items()
+    ):
+        return d
+
+    try:
+        # Encode once, stringifying non-serializable values inline
+        return _loads(_dumps(d))
+    except (TypeError, ValueError):
+        # Isolate the failure to the offending values
+        return {str(key): _serialize_value(value) for key, value in d.items()}
+
+
+def _serialize_value(value):
+    """Convert a single value to JSON-serializable format"""
+    if type(value) in _PRIMITIVE_TYPES:
+        return value
+
+    # Dicts are not recursed into: a failing one may contain itself
+    if hasattr(value, "to_dict"):
+        return _bounded_to_dict(value)
+
+    try:
+        return _loads(_dumps(value))
+    except (TypeError, ValueError):
+        _stringified_types.append(type(value).__name__)
+        return str(value)
+
+
+# Display messages are queued and sent to JS in batches. Messages larger than
+# this many characters skip the queue, and it is flushed once it holds
+# _BATCH_MAX_MESSAGES entries or its oldest entry is _BATCH_MAX_AGE seconds old.
+_BATCH_MAX_CHARS = 64 * 1024
+_BATCH_MAX_MESSAGES = 100
+_BATCH_MAX_AGE = 0.1
 
 # Set up environment for rich terminal output
 os.environ.update(
@@ -56,9 +199,26 @@ class LiteHistoryManager(HistoryManager):
 class RichDisplayPublisher(DisplayPublisher):
     """Enhanced display publisher for rich output handling"""
 
+    # Callbacks are read on every publish - slots make the lookups cheaper
+    __slots__ = (
+        "js_callback",
+        "js_json_callback",
+        "js_batch_callback",
+        "js_pending_callback",
+        "js_clear_callback",
+        "_pending",
+        "_pending_since",
+    )
+
     def __init__(self, shell=None, *args, **kwargs):
         super().__init__(shell, *args, **kwargs)
         self.js_callback = None
+        self.js_clear_callback = None
+        self.js_json_callback = None
+        self.js_batch_callback = None
+        self.js_pending_callback = None
+        self._pending = []
+        self._pending_since = 0.0
 
     def publish(
         self,
@@ -71,63 +231,88 @@ class RichDisplayPublisher(DisplayPublisher):
         **kwargs,
     ):
         """Publish display data with proper serialization"""
+        if self.js_json_callback and data:
+            # Metadata and transient are usually empty - only send them if set
+            message = {"data": data}
+            if metadata:
+                message["metadata"] = metadata
+            if transient:
+                message["transient"] = transient
+            if update:
+                message["update"] = True
+
+            # Encode the whole message once; the worker parses it on the JS side
+            try:
+                payload = _dumps(message)
+            except (TypeError, ValueError):
+                payload = None
+
+            if payload is not None:
+                self._send_json(payload, update)
+                _report_stringified()
+                return
+
         if self.js_callback and data:
+            self.flush_pending()
+
             # Convert data to serializable format
-            serializable_data = self._make_serializable(data)
-            serializable_metadata = self._make_serializable(metadata or {})
-            serializable_transient = self._make_serializable(transient or {})
+            serializable_data = _serialize_dict(data)
+            serializable_metadata = _serialize_dict(metadata) if metadata else {}
+            serializable_transient = _serialize_dict(transient) if transient else {}
 
             self.js_callback(
                 serializable_data, serializable_metadata, serializable_transient, update
             )
+            _report_stringified()
+
+    def _send_json(self, payload, update=False):
+        """Queue an encoded message, or send it right away if large or an update"""
+        # Batching only pays off for small messages, and updates to an
+        # existing display should show up live (e.g. progress bars)
+        if update or self.js_batch_callback is None or len(payload) > _BATCH_MAX_CHARS:
+            self.flush_pending()
+            self.js_json_callback(payload)
+            return
+
+        if not self._pending:
+            self._pending_since = time.monotonic()
+            if self.js_pending_callback:
+                # Let the worker know to flush before it emits stream output
+                self.js_pending_callback()
+        self._pending.append(payload)
+
+        if (
+            len(self._pending) >= _BATCH_MAX_MESSAGES
+            or time.monotonic() - self._pending_since >= _BATCH_MAX_AGE
+        ):
+            self.flush_pending()
+
+    def flush_pending(self):
+        """Send all queued display messages to JS in a single callback"""
+        if self._pending:
+            batch = "[" + ",".join(self._pending) + "]"
+            self._pending.clear()
+            self.js_batch_callback(batch)
 
     def clear_output(self, wait=False):
         """Clear output signal"""
-        if hasattr(self, "js_clear_callback") and self.js_clear_callback:
+        self.flush_pending()
+        if self.js_clear_callback:
             self.js_clear_callback(wait)
         else:
             # Fallback - send clear signal via stdout
             print(f"__CLEAR_OUTPUT__:{wait}", flush=True)
 
-    def _make_serializable(self, obj):
-        """Convert objects to JSON-serializable format"""
-        if obj is None:
-            return {}
-
-        if hasattr(obj, "to_dict"):
-            return obj.to_dict()
-
-        if isinstance(obj, dict):
-            result = {}
-            for key, value in obj.items():
-                try:
-                    # Test if value is JSON serializable
-                    json.dumps(value)
-                    result[str(key)] = value
-                except (TypeError, ValueError) as e:
-                    # Log serialization issues to structured logs
-                    print(
-                        f"[SERIALIZATION_WARNING] Non-serializable value for key '{key}': {e}",
-                        flush=True,
-                    )
-                    # Convert non-serializable values to strings
-                    result[str(key)] = str(value)
-            return result
-
-        try:
-            # Test if object is JSON serializable
-            json.dumps(obj)
-            return obj
-        except (TypeError, ValueError):
-            return str(obj)
-
 
 class RichDisplayHook(DisplayHook):
     """Enhanced display hook for execution results with rich formatting"""
 
+    __slots__ = ("js_callback", "js_json_callback", "execution_count")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.js_callback = None
+        self.js_json_callback = None
         self.execution_count = 0
 
     def __call__(self, result):
@@ -135,19 +320,38 @@ class RichDisplayHook(DisplayHook):
         if result is not None:
             self.execution_count += 1
 
+            # Display output published earlier in the cell comes first
+            flush_pending_displays()
+
             # Format the result using IPython's rich formatting
             try:
                 format_dict, md_dict = self.compute_format_data(result)
 
+                payload = None
+                if self.js_json_callback and format_dict:
+                    # Encode the whole result once for the JS side
+                    message = {"data": format_dict}
+                    if md_dict:
+                        message["metadata"] = md_dict
+                    try:
+                        payload = _dumps(message)
+                    except (TypeError, ValueError):
+                        payload = None
+
+                if payload is not None:
+                    self.js_json_callback(self.execution_count, payload)
+
                 # Make data serializable
-                if self.js_callback and format_dict:
-                    serializable_data = self._make_serializable(format_dict)
-                    serializable_metadata = self._make_serializable(md_dict or {})
+                elif self.js_callback and format_dict:
+                    serializable_data = _serialize_dict(format_dict)
+                    serializable_metadata = _serialize_dict(md_dict) if md_dict else {}
 
                     self.js_callback(
                         self.execution_count, serializable_data, serializable_metadata
                     )
 
+                _report_stringified()
+
             except Exception as e:
                 # Log formatting errors to structured logs instead of stderr
                 print(
@@ -161,35 +365,6 @@ class RichDisplayHook(DisplayHook):
 
         return result
 
-    def _make_serializable(self, obj):
-        """Convert objects to JSON-serializable format"""
-        if obj is None:
-            return {}
-
-        if isinstance(obj, dict):
-            result = {}
-            for key, value in obj.items():
-                try:
-                    # Test if value is JSON serializable
-                    json.dumps(value)
-                    result[str(key)] = value
-                except (TypeError, ValueError) as e:
-                    # Log serialization issues to structured logs
-                    print(
-                        f"[SERIALIZATION_WARNING] Non-serializable value for key '{key}': {e}",
-                        flush=True,
-                    )
-                    # Convert non-serializable values to strings
-                    result[str(key)] = str(value)
-            return result
-
-        try:
-            # Test if object is JSON serializable
-            json.dumps(obj)
-            return obj
-        except (TypeError, ValueError):
-            return str(obj)
-
 
 shell = InteractiveShell.instance(
     displayhook_class=RichDisplayHook,
@@ -200,30 +375,60 @@ shell = InteractiveShell.instance(
 shell.history_manager = LiteHistoryManager(shell=shell, parent=shell)
 
 # Enhanced matplotlib show function with SVG capture
-_original_show = plt.show
+_original_show = None
+
+# Reused across plots to avoid allocating a new buffer per figure
+_FIG_BUF = io.BytesIO()
+
+# Figures with more marks than this are sent as PNG - their SVG would be huge
+_SVG_MAX_MARKS = 5000
+
+
+def _count_figure_marks(fig):
+    """Estimate how many SVG elements a figure would produce"""
+    from matplotlib.collections import QuadMesh
+
+    count = 0
+    for ax in fig.axes:
+        count += len(ax.patches)
+        for line in ax.lines:
+            count += len(line.get_xydata())
+        for collection in ax.collections:
+            if isinstance(collection, QuadMesh):
+                # get_paths() would build a Path per cell - use the grid shape
+                rows, cols = collection.get_coordinates().shape[:2]
+                count += (rows - 1) * (cols - 1)
+            else:
+                count += max(len(collection.get_offsets()), len(collection.get_paths()))
+    return count
 
 
 def _capture_matplotlib_show(block=None):
-    """Capture matplotlib plots as SVG and send via display system"""
+    """Capture matplotlib plots as SVG (PNG for dense plots) and display them"""
+    import matplotlib.pyplot as plt
+
     if plt.get_fignums():
         fig = plt.gcf()
-        svg_buffer = io.StringIO()
+        _FIG_BUF.seek(0)
+        _FIG_BUF.truncate(0)
 
         try:
+            # Use IPython's display system
+            from IPython.display import display, Image, SVG
+
+            use_png = _count_figure_marks(fig) > _SVG_MAX_MARKS
             fig.savefig(
-                svg_buffer,
-                format="svg",
+                _FIG_BUF,
+                format="png" if use_png else "svg",
                 bbox_inches="tight",
                 facecolor="white",
                 edgecolor="none",
             )
-            svg_content = svg_buffer.getvalue()
-            svg_buffer.close()
-
-            # Use IPython's display system
-            from IPython.display import display, SVG
 
-            display(SVG(svg_content))
+            if use_png:
+                display(Image(data=_FIG_BUF.getvalue(), format="png"))
+            else:
+                display(SVG(_FIG_BUF.getvalue().decode("utf-8")))
 
             plt.clf()
         except Exception as e:
@@ -232,8 +437,49 @@ def _capture_matplotlib_show(block=None):
     return _original_show(block=block) if block is not None else _original_show()
 
 
-# Replace matplotlib show with our enhanced version
-plt.show = _capture_matplotlib_show
+def setup_matplotlib(plt):
+    """Apply notebook plot defaults and route plt.show through IPython display"""
+    global _original_show
+
+    plt.rcParams["figure.dpi"] = 100
+    plt.rcParams["savefig.dpi"] = 100
+    plt.rcParams["figure.facecolor"] = "white"
+    plt.rcParams["savefig.facecolor"] = "white"
+    plt.rcParams["figure.figsize"] = (8, 6)
+
+    # Replace matplotlib show with our enhanced version
+    _original_show = plt.show
+    plt.show = _capture_matplotlib_show
+
+
+class PyplotImportHook(importlib.abc.MetaPathFinder):
+    """Run setup_matplotlib right after matplotlib.pyplot is first imported"""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != "matplotlib.pyplot":
+            return None
+
+        # One-shot: resolve the real spec with the remaining finders
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+
+        exec_module = spec.loader.exec_module
+
+        def exec_and_setup(module):
+            exec_module(module)
+            setup_matplotlib(module)
+
+        spec.loader.exec_module = exec_and_setup
+        return spec
+
+
+# Importing matplotlib costs seconds in Pyodide - defer it until it is used
+if "matplotlib.pyplot" in sys.modules:
+    setup_matplotlib(sys.modules["matplotlib.pyplot"])
+else:
+    sys.meta_path.insert(0, PyplotImportHook())
 
 
 def setup_rich_formatters():
@@ -269,8 +515,6 @@ setup_rich_formatters()
 def format_exception(exc_type, exc_value, exc_traceback):
     """Format exceptions with standard Python traceback formatting"""
     try:
-        import traceback
-
         # Use standard traceback formatting to preserve exception type information
         return "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
     except Exception as format_error:
@@ -282,10 +526,13 @@ def format_exception(exc_type, exc_value, exc_traceback):
         return f"{exc_type.__name__}: {exc_value}"
 
 
+def _excepthook(exc_type, exc_value, exc_traceback):
+    """Write uncaught exceptions to stderr using format_exception"""
+    sys.stderr.write(format_exception(exc_type, exc_value, exc_traceback) + "\n")
+
+
 # Override exception formatting
-sys.excepthook = lambda exc_type, exc_value, exc_traceback: print(
-    format_exception(exc_type, exc_value, exc_traceback), file=sys.stderr
-)
+sys.excepthook = _excepthook
 
 print("IPython environment ready with rich display support")
 
@@ -301,12 +548,41 @@ def default_execution_callback(execution_count, data, metadata):
     pass
 
 
+def default_display_json_callback(payload):
+    """Default JSON display callback - does nothing"""
+    pass
+
+
+def default_execution_json_callback(execution_count, payload):
+    """Default JSON execution callback - does nothing"""
+    pass
+
+
+def default_display_batch_callback(batch):
+    """Default batched display callback - does nothing"""
+    pass
+
+
+def default_display_pending_callback():
+    """Default pending display callback - does nothing"""
+    pass
+
+
 def default_clear_callback(wait=False):
     """Default clear callback - does nothing"""
     pass
 
 
+def flush_pending_displays():
+    """Send any queued display output to JS"""
+    shell.display_pub.flush_pending()
+
+
 async def bootstrap_micropip_packages():
+    # Skip the network fetch when the Pyodide distribution already bundles it
+    if importlib.util.find_spec("seaborn") is not None:
+        return
+
     try:
         import micropip
 
@@ -348,15 +624,19 @@ def setup_interrupt_patches():
     except Exception as e:
         print(f"Warning: Could not install signal handler: {e}", flush=True)
 
-    def check_interrupt():
+    def check_interrupt(pyodide_check=None):
         """Check for interrupts using Pyodide's mechanism"""
         if not _interrupt_check_enabled:
             return
 
-        try:
+        if pyodide_check is None:
             # This will be available when running in Pyodide
-            if hasattr(__builtins__, "pyodide_check_interrupt"):
-                __builtins__.pyodide_check_interrupt()
+            pyodide_check = getattr(builtins, "pyodide_check_interrupt", None)
+            if pyodide_check is None:
+                return
+
+        try:
+            pyodide_check()
         except KeyboardInterrupt:
             print(
                 "[INTERRUPT] KeyboardInterrupt detected via pyodide_check_interrupt",
@@ -369,16 +649,23 @@ def setup_interrupt_patches():
 
     def interrupt_aware_sleep(duration):
         """Sleep function that checks for interrupts periodically"""
+        # Show queued display output before blocking
+        flush_pending_displays()
+
         if duration <= 0:
             return
 
-        # Check for interrupts in smaller chunks for better responsiveness
-        chunk_size = 0.05  # 50ms chunks for better responsiveness
+        # The worker rebinds the checker per execution, so resolve it per call
+        pyodide_check = getattr(builtins, "pyodide_check_interrupt", None)
+
+        # Check for interrupts between chunks so long sleeps can be cancelled
+        chunk_size = 0.25  # Responsive enough for a user hitting interrupt
         remaining = float(duration)
 
         while remaining > 0:
             # Check for interrupt before each chunk
-            check_interrupt()
+            if pyodide_check is not None:
+                check_interrupt(pyodide_check)
 
             # Sleep for the smaller of chunk_size or remaining time
             sleep_time = min(chunk_size, remaining)
@@ -393,6 +680,7 @@ def setup_interrupt_patches():
 
     def interrupt_aware_input(prompt=""):
         """Input function that can be interrupted"""
+        flush_pending_displays()
         check_interrupt()
 
         # Call original input (this will still block, but at least we checked once)
@@ -428,6 +716,10 @@ def setup_interrupt_patches():
 # Make callbacks available globally
 js_display_callback = default_display_callback
 js_execution_callback = default_execution_callback
+js_display_json_callback = default_display_json_callback
+js_execution_json_callback = default_execution_json_callback
+js_display_batch_callback = default_display_batch_callback
+js_display_pending_callback = default_display_pending_callback
 js_clear_callback = default_clear_callback
 
 # Set up interrupt patches
@@ -438,6 +730,11 @@ __all__ = [
     "shell",
     "js_display_callback",
     "js_execution_callback",
+    "js_display_json_callback",
+    "js_execution_json_callback",
+    "js_display_batch_callback",
+    "js_display_pending_callback",
     "js_clear_callback",
+    "flush_pending_displays",
     "setup_interrupt_patches",
 ]
@@ -20,6 +20,19 @@ declare const self: DedicatedWorkerGlobalScope;
 let pyodide: PyodideInterface | null = null;
 let interruptBuffer: SharedArrayBuffer | null = null;
 
+// Python queues small display outputs and sends them in batches. It flags
+// the first queued output so stream writes can flush the queue first and
+// keep outputs in order.
+let displaysPending = false;
+let flushPendingDisplays: (() => void) | null = null;
+
+// Queued outputs are also flushed after this delay, so displays from code
+// that keeps running after the cell returns (e.g. asyncio tasks) still show up
+const DISPLAY_FLUSH_DELAY_MS = 100;
+
+// Shared by the stdout/stderr write handlers instead of one per write
+const streamDecoder = new TextDecoder();
+
 // Global error handler for uncaught worker errors
 self.addEventListener("error", (event) => {
   self.postMessage({
@@ -196,7 +209,10 @@ async function initializePyodide(
   pyodide.setStdout({
     write: (buffer: Uint8Array) => {
       // Convert buffer to text
-      const text = new TextDecoder().decode(buffer);
+      const text = streamDecoder.decode(buffer);
+
+      // Display outputs queued before this write must be sent first
+      flushDisplays();
 
       // Send stdout immediately without coalescing to preserve newlines
       if (text) {
@@ -214,7 +230,10 @@ async function initializePyodide(
   pyodide.setStderr({
     write: (buffer: Uint8Array) => {
       // Convert buffer to text
-      const text = new TextDecoder().decode(buffer);
+      const text = streamDecoder.decode(buffer);
+
+      // Display outputs queued before this write must be sent first
+      flushDisplays();
 
       // Send stderr immediately without coalescing to be consistent with stdout
       if (text) {
@@ -317,79 +336,76 @@ async function executePython(code: string): Promise<{
       ) => {
         try {
           // Ensure data is serializable
-          const serializedData = ensureSerializable(data);
-          const serializedMetadata = ensureSerializable(metadata);
-          const serializedTransient = ensureSerializable(transient);
-
-          const outputType = update ? "update_display_data" : "display_data";
+          postDisplayData(
+            ensureSerializable(data),
+            ensureSerializable(metadata),
+            ensureSerializable(transient),
+            update,
+          );
+        } catch (error) {
+          postSerializationError("display", error);
+        }
+      },
+    );
 
-          self.postMessage({
-            type: "stream_output",
-            data: {
-              type: outputType,
-              data: serializedData,
-              metadata: serializedMetadata,
-              transient: serializedTransient,
-            },
-          });
+    // Display data pre-encoded as JSON in Python - no PyProxy conversion
+    pyodide.globals.set(
+      "js_display_json_callback",
+      (payload: string) => {
+        try {
+          postDisplayMessage(JSON.parse(payload));
+        } catch (error) {
+          postSerializationError("display", error);
+        }
+      },
+    );
 
-          // Don't accumulate display events in outputs array to prevent memory leak
-          // Display events are already streamed via postMessage -> ExecutionContext
+    // A JSON array of display messages queued during execution
+    pyodide.globals.set(
+      "js_display_batch_callback",
+      (batch: string) => {
+        try {
+          for (const message of JSON.parse(batch)) {
+            postDisplayMessage(message);
+          }
         } catch (error) {
-          self.postMessage({
-            type: "log",
-            data: `Error in display callback: ${error}`,
-          });
-          self.postMessage({
-            type: "stream_output",
-            data: {
-              type: "error",
-              data: {
-                ename: "SerializationError",
-                evalue: `Error serializing display data: ${error}`,
-                traceback: [String(error)],
-              },
-            },
-          });
+          postSerializationError("display", error);
         }
       },
     );
 
+    pyodide.globals.set(
+      "js_display_pending_callback",
+      () => {
+        displaysPending = true;
+        setTimeout(flushDisplays, DISPLAY_FLUSH_DELAY_MS);
+      },
+    );
+
     pyodide.globals.set(
       "js_execution_callback",
       (execution_count: number, data: unknown, metadata: unknown) => {
         try {
           // Ensure data is serializable
-          const serializedData = ensureSerializable(data);
-          const serializedMetadata = ensureSerializable(metadata);
-
-          self.postMessage({
-            type: "stream_output",
-            data: {
-              type: "execute_result",
-              data: serializedData,
-              metadata: serializedMetadata,
-              execution_count,
-            },
-          });
+          postExecuteResult(
+            execution_count,
+            ensureSerializable(data),
+            ensureSerializable(metadata),
+          );
+        } catch (error) {
+          postSerializationError("execution", error);
+        }
+      },
+    );
 
-          // Don't accumulate in outputs - streaming directly to ExecutionContext
+    pyodide.globals.set(
+      "js_execution_json_callback",
+      (execution_count: number, payload: string) => {
+        try {
+          const { data, metadata = {} } = JSON.parse(payload);
+          postExecuteResult(execution_count, data, metadata);
         } catch (error) {
-          self.postMessage({
-            type: "log",
-            data: `Error in execution callback: ${error}`,
-          });
-          self.postMessage({
-            type: "stream_output",
-            data: {
-              type: "error",
-              data: {
-                ename: "SerializationError",
-                evalue: `Error serializing execution result: ${error}`,
-                traceback: [String(error)],
-              },
-            },
-          });
+          postSerializationError("execution", error);
         }
       },
     );
@@ -437,8 +453,12 @@ async function executePython(code: string): Promise<{
     await pyodide.runPythonAsync(`
 # Connect our JavaScript callbacks to the IPython shell
 shell.display_pub.js_callback = js_display_callback
+shell.display_pub.js_json_callback = js_display_json_callback
+shell.display_pub.js_batch_callback = js_display_batch_callback
+shell.display_pub.js_pending_callback = js_display_pending_callback
 shell.display_pub.js_clear_callback = js_clear_callback
 shell.displayhook.js_callback = js_execution_callback
+shell.displayhook.js_json_callback = js_execution_json_callback
 
 # Make clear_output available globally for users
 from IPython.display import clear_output
@@ -448,6 +468,8 @@ import builtins
 builtins.pyodide_check_interrupt = pyodide_check_interrupt
 `);
 
+    flushPendingDisplays ??= pyodide.globals.get("flush_pending_displays");
+
     // Execute the code directly with Pyodide (no IPython transformations)
     try {
       // Check for interrupt before execution
@@ -551,6 +573,9 @@ if '_pyodide_result' in globals():
     };
   }
 
+  // Deliver display output still queued at the end of the cell
+  flushDisplays();
+
   // Send error if one occurred
   if (executionError) {
     self.postMessage({
@@ -564,6 +589,119 @@ if '_pyodide_result' in globals():
   };
 }
 
+/**
+ * Send display outputs queued in Python, if any
+ */
+function flushDisplays(): void {
+  if (!displaysPending || !flushPendingDisplays) {
+    return;
+  }
+
+  displaysPending = false;
+  try {
+    flushPendingDisplays();
+  } catch (error) {
+    self.postMessage({
+      type: "log",
+      data: `Error flushing display outputs: ${error}`,
+    });
+  }
+}
+
+/**
+ * Stream a display_data or update_display_data output to the main thread
+ */
+function postDisplayData(
+  data: unknown,
+  metadata: unknown,
+  transient: unknown,
+  update: boolean,
+): void {
+  const outputType = update ? "update_display_data" : "display_data";
+
+  self.postMessage({
+    type: "stream_output",
+    data: {
+      type: outputType,
+      data,
+      metadata,
+      transient,
+    },
+  });
+
+  // Don't accumulate display events in outputs array to prevent memory leak
+  // Display events are already streamed via postMessage -> ExecutionContext
+}
+
+/**
+ * A display message encoded in Python - empty fields are left out
+ */
+interface DisplayMessage {
+  data: unknown;
+  metadata?: unknown;
+  transient?: unknown;
+  update?: boolean;
+}
+
+/**
+ * Stream a display message decoded from Python's JSON payload
+ */
+function postDisplayMessage(message: DisplayMessage): void {
+  postDisplayData(
+    message.data,
+    message.metadata ?? {},
+    message.transient ?? {},
+    message.update ?? false,
+  );
+}
+
+/**
+ * Stream an execute_result output to the main thread
+ */
+function postExecuteResult(
+  execution_count: number,
+  data: unknown,
+  metadata: unknown,
+): void {
+  self.postMessage({
+    type: "stream_output",
+    data: {
+      type: "execute_result",
+      data,
+      metadata,
+      execution_count,
+    },
+  });
+
+  // Don't accumulate in outputs - streaming directly to ExecutionContext
+}
+
+/**
+ * Report a failure to serialize display or execution output
+ */
+function postSerializationError(
+  kind: "display" | "execution",
+  error: unknown,
+): void {
+  self.postMessage({
+    type: "log",
+    data: `Error in ${kind} callback: ${error}`,
+  });
+  self.postMessage({
+    type: "stream_output",
+    data: {
+      type: "error",
+      data: {
+        ename: "SerializationError",
+        evalue: kind === "display"
+          ? `Error serializing display data: ${error}`
+          : `Error serializing execution result: ${error}`,
+        traceback: [String(error)],
+      },
+    },
+  });
+}
+
 /**
  * Ensure data is serializable for postMessage
  */
@@ -169,6 +169,11 @@ Deno.test("getBootstrapPackages", () => {
     true,
     "Bootstrap should include matplotlib",
   );
+  assertEquals(
+    bootstrapPackages.includes("orjson"),
+    true,
+    "Bootstrap should include orjson",
+  );
 
   // Should be minimal - only essential packages for IPython setup
   assertEquals(
@@ -180,6 +180,25 @@ Deno.test({
     assertEquals(resultOutputs.length > 0, true);
   });
 
+  await t.step("equal results keep their own repr", async () => {
+    for (const [code, expected] of [
+      ["(1, 2)", "(1, 2)"],
+      ["(1.0, 2.0)", "(1.0, 2.0)"],
+      ["(True, 2)", "(True, 2)"],
+    ]) {
+      const { context, outputs } = createTestExecutionContext(code);
+
+      const result: ExecutionResult = await agent.executeCell(context);
+      assertEquals(result.success, true);
+
+      const resultOutputs = outputs.filter((o) => o.type === "result");
+      assertEquals(resultOutputs.length, 1);
+
+      const data = resultOutputs[0]?.data as Record<string, unknown>;
+      assertEquals(data["text/plain"], expected);
+    }
+  });
+
   await t.step("Python variables and expressions", async () => {
     const { context, outputs } = createTestExecutionContext(`
 x = 42
@@ -288,6 +307,96 @@ display(HTML("<b>Bold text from IPython</b>"))
     assertEquals(hasHtmlDisplay, true);
   });
 
+  await t.step("self-referencing display data is stringified", async () => {
+    const { context, outputs } = createTestExecutionContext(`
+from IPython.display import display
+d = {"a": 1}
+d["self"] = d
+display({"text/plain": "x", "application/json": d}, raw=True)
+    `);
+
+    const result: ExecutionResult = await agent.executeCell(context);
+    assertEquals(result.success, true);
+
+    assertEquals(outputs.filter((o) => o.type === "error").length, 0);
+
+    const displayOutputs = outputs.filter((o) => o.type === "display");
+    assertEquals(displayOutputs.length, 1);
+
+    const data = displayOutputs[0]?.data as Record<string, unknown>;
+    assertEquals(data["text/plain"], "x");
+  });
+
+  // Reduce captured outputs to one label per line/output, in arrival order
+  function outputOrder(outputs: CapturedOutput[]): string[] {
+    return outputs.flatMap((o) => {
+      const data = o.data as Record<string, unknown>;
+      switch (o.type) {
+        case "stdout": {
+          const lines = (o.data as string).split("\n").filter((l) => l);
+          return lines.map((line) => `stdout:${line}`);
+        }
+        case "display": {
+          const html = data["text/html"] as string;
+          return [html.length > 1000 ? "display:<large>" : `display:${html}`];
+        }
+        case "result":
+          return [`result:${data["text/plain"]}`];
+        case "error":
+          return [`error:${data.ename}`];
+        default:
+          return [];
+      }
+    });
+  }
+
+  await t.step("display output interleaves with print in order", async () => {
+    const { context, outputs } = createTestExecutionContext(`
+from IPython.display import HTML, display
+print("one")
+display(HTML("<p>two</p>"))
+display(HTML("<p>three</p>"))
+print("four")
+display(HTML("<p>" + "x" * 70000 + "</p>"))
+display(HTML("<p>six</p>"))
+for i in range(150):
+    display(HTML(f"<p>n{i}</p>"))
+print("end")
+"done"
+    `);
+
+    const result: ExecutionResult = await agent.executeCell(context);
+    assertEquals(result.success, true);
+
+    assertEquals(outputOrder(outputs), [
+      "stdout:one",
+      "display:<p>two</p>",
+      "display:<p>three</p>",
+      "stdout:four",
+      "display:<large>",
+      "display:<p>six</p>",
+      ...Array.from({ length: 150 }, (_, i) => `display:<p>n${i}</p>`),
+      "stdout:end",
+      "result:'done'",
+    ]);
+  });
+
+  await t.step("queued display output precedes the error", async () => {
+    const { context, outputs } = createTestExecutionContext(`
+from IPython.display import HTML, display
+display(HTML("<p>before error</p>"))
+raise ValueError("after display")
+    `);
+
+    const result: ExecutionResult = await agent.executeCell(context);
+    assertEquals(result.success, true);
+
+    assertEquals(outputOrder(outputs), [
+      "display:<p>before error</p>",
+      "error:ValueError",
+    ]);
+  });
+
   await t.step("cleanup", async () => {
     await agent.shutdown();
   });